@@ -1,16 +1,11 @@
 # section 1 load all the necessary modules and packages
-import glob
-import time
-import geopandas as gpd
-import netCDF4 as nc4
+# the geometry packages (geopandas, pandas, pyshp, shapely) are imported on first use in the functions, so that the
+# remapping functions can be used without them
 import numpy as np
-import pandas as pd
-import xarray as xr
-from shapely.geometry import Polygon
-# not neccessary for the function but for visualziation
-import matplotlib.pyplot as plt
-# additional packages for speed-up
-import shapefile # PyShp library
+# the remapping functions, kept here so they can be imported from candex.functions
+from .remap import (read_value_lat_lon_nc, read_value_lat_lon_nc_batch, point_weights, area_ave, area_ave_multi,
+                    weights_intersection, weights_aggregate, nc_cell_index, nc_cell_values, nc_read_file, prefetch_map,
+                    weighted_sum, weighted_sum_masked, time_aggregate, write_netcdf)
 
 def lat_lon_2D(lat, lon):
     """
@@ -43,7 +38,7 @@ def lat_lon_2D(lat, lon):
     return np.meshgrid(lat, lon)
 
 
-def lat_lon_SHP(lat, lon, box_values, correct_360, filename = 'noFileNameSpecified'):
+def lat_lon_SHP(lat, lon, box_values, correct_360, filename = 'noFileNameSpecified', shp_target = None):
     """
     @ author:                  Shervan Gharari, Wouter Knoben
     @ Github:                  https://github.com/ShervanGharari/candex
@@ -55,6 +50,7 @@ def lat_lon_SHP(lat, lon, box_values, correct_360, filename = 'noFileNameSpecifi
     correct_360 is True, then the values of more than 180 for the lon are converted to negative lon
     correct_360 is False, then the cordinates of the shapefile remain in 0 to 360 degree
     The function remove the first, last rows and colomns
+    If shp_target is provided, only the cells that can intersect with the target shapes are created (see footprint_mask)
     
     Arguments
     ---------
@@ -63,6 +59,7 @@ def lat_lon_SHP(lat, lon, box_values, correct_360, filename = 'noFileNameSpecifi
     box_values: a 1D array [minlat, maxlat, minlon, maxlon]
     correct_360: logical, True or Flase
     filename: file name for the shapefile that will be created. Default = 'noFileNameSpecified'
+    shp_target: geopandas data frame or shapely geometry of the target shapes. Default = None, all the cells within the box
     
     Returns
     -------
@@ -72,7 +69,8 @@ def lat_lon_SHP(lat, lon, box_values, correct_360, filename = 'noFileNameSpecifi
     -------
     filename: a shapefile with (n-2)*(m-2) elements depicting the provided 2-D lat and lon values
     """
-    
+    import shapefile # PyShp library
+
     # getting the shape of the lat and lon (assuming that they have the same shape [n,m,])
     idx = lat.shape
     
@@ -81,6 +79,12 @@ def lat_lon_SHP(lat, lon, box_values, correct_360, filename = 'noFileNameSpecifi
         IN = lon>180 # index of more than 180
         lon[IN] = lon[IN]-360 # index of point with higher than are reduced to -180 to 0 instead
 
+    # the cells that can intersect with the target shapes, all the cells if no target shapes are provided
+    if shp_target is not None:
+        mask = footprint_mask(lat, lon, shp_target)
+    else:
+        mask = np.ones(idx, dtype=bool)
+
     # create a new shapefile
     with shapefile.Writer(filename) as w:
         w = shapefile.Writer(filename)
@@ -107,7 +111,7 @@ def lat_lon_SHP(lat, lon, box_values, correct_360, filename = 'noFileNameSpecifi
                 
                 # checking if lat and lon are located inside the provided box
                 if lat[i, j] > box_values[0] and lat[i, j] < box_values[1] and lon[i, j] > box_values[
-                    2] and lon[i, j] < box_values[3]: 
+                    2] and lon[i, j] < box_values[3] and mask[i, j]: 
                     
                     # Creating the lat of the shapefile
                     Lat_Up = (lat[i - 1, j] + lat[i, j]) / 2
@@ -152,7 +156,175 @@ def lat_lon_SHP(lat, lon, box_values, correct_360, filename = 'noFileNameSpecifi
     return
 
 
-def NetCDF_SHP_lat_lon(name_of_nc, box_values, name_of_lat_var, name_of_lon_var, correct_360):
+def footprint_mask(lat, lon, shp_target, buffer_value=None):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function finds the cells of a 2-D lat and lon that can intersect with the target shapes. The union of the
+    target shapes is buffered by the largest distance between the neighbouring cell centers (with the lon differences
+    wrapped into [-180, 180) for grids that cross the 180 or 0 degree line), so that the cells with a center outside
+    of the target shapes but an edge inside of them are kept, and the cell centers are checked against it
+
+    Arguments
+    ---------
+    lat: the 2D matrix of lat_2D [n,m,]
+    lon: the 2D matrix of lon_2D [n,m,]
+    shp_target: geopandas data frame or shapely geometry of the target shapes
+    buffer_value: buffer value in degrees or meters. Default = None, the largest distance between the neighbouring
+                  cell centers
+
+    Returns
+    -------
+    mask: logical 2D matrix [n,m,], True for the cells that can intersect with the target shapes
+    """
+    # the union of the target shapes
+    if hasattr(shp_target, 'union_all'):
+        footprint = shp_target.union_all()
+    elif hasattr(shp_target, 'unary_union'):
+        footprint = shp_target.unary_union
+    else:
+        footprint = shp_target
+
+    # the buffer is the largest distance between the neighbouring cell centers
+    if buffer_value is None:
+        buffer_value = 0
+        for axis in range(lat.ndim):
+            if lat.shape[axis] > 1:
+                # the lon differences are wrapped into [-180, 180) so the jump at the 180 degree line is not counted
+                d_lon = (np.diff(lon, axis=axis) + 180) % 360 - 180
+                distance = np.sqrt(np.diff(lat, axis=axis)**2 + d_lon**2)
+                buffer_value = max(buffer_value, np.nanmax(distance))
+    footprint = footprint.buffer(buffer_value)
+
+    # checking the cell centers against the buffered footprint in one go
+    try:
+        from shapely import contains_xy # shapely 2
+    except ImportError:
+        from shapely.vectorized import contains as contains_xy # shapely 1
+    return np.array(contains_xy(footprint, lon, lat), dtype=bool).reshape(lat.shape)
+
+
+def lat_lon_bounds_SHP(lat, lon, lat_bounds, lon_bounds, box_values, correct_360, filename = 'noFileNameSpecified',
+                       shp_target = None):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function gets the lat and lon of the cell centers and the lat and lon of the cell vertices, such as the CF
+    lat_bnds and lon_bnds variables, and return the shapefile of the cells. The corners of all the cells are created
+    at once from the vertices, so no row or colomn is removed and the cells are exact also for curvilinear and
+    unstructured grids.
+    correct_360 is True, then the values of more than 180 for the lon are converted to negative lon
+    correct_360 is False, then the cordinates of the shapefile remain in 0 to 360 degree
+    The lat and lon fields of the shapefile are the values of the cell centers in the source .nc file
+
+    Arguments
+    ---------
+    lat: the lat of the cell centers, [n,] for regular grids or any shape [...] for curvilinear or unstructured grids
+    lon: the lon of the cell centers, [m,] for regular grids or the same shape as lat
+    lat_bounds: the lat of the vertices, [n,2] for regular grids or [...,k] for curvilinear or unstructured grids
+    lon_bounds: the lon of the vertices, [m,2] for regular grids or [...,k] for curvilinear or unstructured grids
+    box_values: a 1D array [minlat, maxlat, minlon, maxlon]
+    correct_360: logical, True or Flase
+    filename: file name for the shapefile that will be created. Default = 'noFileNameSpecified'
+    shp_target: geopandas data frame or shapely geometry of the target shapes. Default = None, all the cells within the box
+
+    Returns
+    -------
+    nothing
+
+    Creates
+    -------
+    filename: a shapefile with the cells within the box depicting the provided lat and lon values
+    """
+    import shapefile # PyShp library
+
+    lat = np.array(lat, dtype=float)
+    lon = np.array(lon, dtype=float)
+    lat_bounds = np.array(lat_bounds, dtype=float)
+    lon_bounds = np.array(lon_bounds, dtype=float)
+
+    # regular grid, lat and lon are 1-dimensional and independent with two bounds each
+    if lat.ndim == 1 and lat_bounds.shape[-1] == 2 and lon_bounds.shape[-1] == 2:
+        lat, lon = np.meshgrid(lat, lon, indexing='ij')
+        lat_bounds = np.broadcast_to(lat_bounds[:, np.newaxis, [0, 0, 1, 1]], lat.shape + (4,))
+        lon_bounds = np.broadcast_to(lon_bounds[np.newaxis, :, [0, 1, 1, 0]], lon.shape + (4,))
+
+    # flattening the cells
+    lat = lat.reshape(-1)
+    lon = lon.reshape(-1)
+    lat_bounds = lat_bounds.reshape(lat.size, -1)
+    lon_bounds = lon_bounds.reshape(lon.size, -1)
+    center_lon = lon.copy() # lon value of data point in source .nc file
+
+    # making sure that the lon is less than 180, the vertices are moved with their cell center
+    if correct_360 is True:
+        IN = lon>180 # index of more than 180
+        lon[IN] = lon[IN]-360
+        lon_bounds = lon_bounds - 360 * IN[:, np.newaxis]
+
+    # making the vertices clockwise, as the shapefile needs, using the sign of the area of every cell
+    area = np.sum(lon_bounds * np.roll(lat_bounds, -1, axis=1) - np.roll(lon_bounds, -1, axis=1) * lat_bounds, axis=1)
+    lat_bounds = np.where(area[:, np.newaxis] > 0, lat_bounds[:, ::-1], lat_bounds)
+    lon_bounds = np.where(area[:, np.newaxis] > 0, lon_bounds[:, ::-1], lon_bounds)
+
+    # checking if lat and lon are located inside the provided box
+    IN = (lat > box_values[0]) & (lat < box_values[1]) & (lon > box_values[2]) & (lon < box_values[3])
+    if shp_target is not None:
+        # the buffer is the largest distance between a cell center and its vertices
+        buffer_value = np.nanmax(np.sqrt((lat_bounds - lat[:, np.newaxis])**2 + (lon_bounds - lon[:, np.newaxis])**2))
+        IN = IN & footprint_mask(lat, lon, shp_target, buffer_value=buffer_value)
+
+    # create a new shapefile
+    with shapefile.Writer(filename) as w:
+        w.autoBalance = 1 # turn on function that keeps file stable if number of shapes and records don't line up
+        w.field("ID",'N') # create (N)umerical attribute fields, integer
+        w.field("lat",'F',decimal=4) # float with 4 decimals
+        w.field("lon",'F',decimal=4)
+
+        for i in np.flatnonzero(IN):
+            # creating the closed polygon given the vertices
+            parts = [list(zip(lon_bounds[i], lat_bounds[i])) + [(lon_bounds[i, 0], lat_bounds[i, 0])]]
+            w.poly(parts)
+            # the ID is the position of the cell so that it is the same for any box
+            w.record(i + 1, lat[i], center_lon[i])
+    return
+
+
+def nc_bounds_name(dataset, name_of_var):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function finds the name of the variable with the cell bounds of a lat or lon variable, from the CF bounds
+    attribute or the common names such as lat_bnds, lat_bounds and lat_vertices
+
+    Arguments
+    ---------
+    dataset: xarray dataset, the opened NetCDF file
+    name_of_var: string, the name of the variable lat or lon
+
+    Returns
+    -------
+    name_of_bounds: string, the name of the bounds variable, None if there is no bounds variable
+    """
+    names = [dataset[name_of_var].attrs.get('bounds'), dataset[name_of_var].encoding.get('bounds')]
+    names += [name_of_var + suffix for suffix in ('_bnds', '_bounds', '_vertices')]
+    for name in names:
+        if name is not None and name in dataset.variables:
+            return name
+    return None
+
+
+def NetCDF_SHP_lat_lon(name_of_nc, box_values, name_of_lat_var, name_of_lon_var, correct_360, shp_target = None,
+                       use_bounds = True):
     """
     @ author:                  Shervan Gharari
     @ Github:                  https://github.com/ShervanGharari/candex
@@ -169,11 +341,17 @@ def NetCDF_SHP_lat_lon(name_of_nc, box_values, name_of_lat_var, name_of_lon_var,
     name_of_lat_var: string, the name of the variable lat
     name_of_lon_var: string, the name of the variable lon
     correct_360: logical, True or Flase
+    shp_target: geopandas data frame or shapely geometry of the target shapes, only the cells that can intersect with
+                them are created. Default = None
+    use_bounds: logical, if True and the nc file has the bounds of the lat and lon (see nc_bounds_name) the cells are
+                created from the bounds (see lat_lon_bounds_SHP). Default = True
     
     Returns
     -------
     result: a shapefile for the NetCDF file
     """
+    import xarray as xr
+
     # open the nc file to read
     dataset = xr.open_dataset(name_of_nc, decode_times=False)
 
@@ -184,17 +362,26 @@ def NetCDF_SHP_lat_lon(name_of_nc, box_values, name_of_lat_var, name_of_lon_var,
     lat = np.array(lat)
     lon = np.array(lon)
 
+    # creating the shapefile from the bounds of the cells if they exist
+    name_of_lat_bounds = nc_bounds_name(dataset, name_of_lat_var)
+    name_of_lon_bounds = nc_bounds_name(dataset, name_of_lon_var)
+    if use_bounds and name_of_lat_bounds is not None and name_of_lon_bounds is not None:
+        lat_bounds = np.array(dataset[name_of_lat_bounds].data)
+        lon_bounds = np.array(dataset[name_of_lon_bounds].data)
+        result = lat_lon_bounds_SHP(lat, lon, lat_bounds, lon_bounds, box_values, correct_360, shp_target = shp_target)
+        return result
+
     # check if lat and lon are 1 D, if yes then they should be converted to 2D lat and lon WARNING only for case 1 and 2
     if len(lat.shape) == 1 and len(lon.shape) == 1:
         lat, lon = lat_lon_2D(lat, lon)
 
     # creating the shapefile
-    result = lat_lon_SHP(lat, lon, box_values, correct_360)
+    result = lat_lon_SHP(lat, lon, box_values, correct_360, shp_target = shp_target)
 
     return result
 
 
-def intersection_shp(shp_1, shp_2):
+def intersection_shp(shp_1, shp_2, weights_only=False, keep_geometry=False, fields=('S_2_lat', 'S_2_lon')):
     """
     @ author:                  Shervan Gharari
     @ Github:                  https://github.com/ShervanGharari/candex
@@ -209,17 +396,25 @@ def intersection_shp(shp_1, shp_2):
     summation is not 1 for a given shape from shapefile 1, this will help to preseve mass if part of the shapefile are not 
     intersected), AP2N (the area normalized in the case AP2 summation is not 1 for a given shape from shapefile 2, this
     will help to preseve mass if part of the shapefile are not intersected)
+    If weights_only is True, only the fields that are needed for remapping are kept from the start, which reduces the
+    memory of the intersection, and a data frame with IDS1, IDS2, AINT, AP1N, AP2N and the given fields is returned
     
     Arguments
     ---------
     shp1: geo data frame, shapefile 1
     shp2: geo data frame, shapefile 2
+    weights_only: logical, True or False. Default = False
+    keep_geometry: logical, if True the intersected shapes are kept when weights_only is True. Default = False
+    fields: the fields (with S_1_ or S_2_) that are kept when weights_only is True. Default = ('S_2_lat', 'S_2_lon'),
+            the lat and lon of the NetCDF shapefile
     
     Returns
     -------
     result: a geo data frame that includes the intersected shapefile and area, percent and normalized percent of each shape
     elements in another one
     """
+    import pandas as pd
+
     # Calculating the area of every shapefile (both should be in degree or meters)
     column_names = shp_1.columns
     column_names = list(column_names)
@@ -244,14 +439,17 @@ def intersection_shp(shp_1, shp_2):
             columns={column_names[i]: 'S_2_' + column_names[i]})
 
     # Caclulating the area for shp1
-    for index, _ in shp_1.iterrows():
-        shp_1.loc[index, 'AS1'] = shp_1.area[index]
-        shp_1.loc[index, 'IDS1'] = index + 1.00
+    shp_1['AS1'] = shp_1.area
+    shp_1['IDS1'] = shp_1.index + 1.00
 
     # Caclulating the area for shp2
-    for index, _ in shp_2.iterrows():
-        shp_2.loc[index, 'AS2'] = shp_2.area[index]
-        shp_2.loc[index, 'IDS2'] = index + 1.00
+    shp_2['AS2'] = shp_2.area
+    shp_2['IDS2'] = shp_2.index + 1.00
+
+    # keeping only the needed fields so they are not copied in the intersection
+    if weights_only:
+        shp_1 = shp_1[[name for name in shp_1.columns if name in fields] + ['AS1', 'IDS1', 'geometry']]
+        shp_2 = shp_2[[name for name in shp_2.columns if name in fields] + ['AS2', 'IDS2', 'geometry']]
 
     # making intesection
     result = spatial_overlays (shp_1, shp_2, how='intersection')
@@ -286,6 +484,13 @@ def intersection_shp(shp_1, shp_2):
         
     result ['AP1N'] = AP1N
     result ['AP2N'] = AP2N
+
+    # returning only the weights and the given fields
+    if weights_only:
+        column_names = ['IDS1', 'IDS2', 'AINT', 'AP1N', 'AP2N'] + [name for name in fields if name in result.columns]
+        if keep_geometry:
+            return result[column_names + ['geometry']].reset_index(drop=True)
+        return pd.DataFrame(result[column_names]).reset_index(drop=True)
         
         
     
@@ -314,209 +519,6 @@ def intersection_shp(shp_1, shp_2):
         
     return result
 
-def read_value_lat_lon_nc(case,
-                          lat_target, lon_target, name_of_nc,
-                          name_of_variable, name_of_time_dim,
-                          name_of_lat_var, name_of_lon_var,
-                          name_of_lat_dim, name_of_lon_dim):
-    """
-    @ author:                  Shervan Gharari
-    @ Github:                  https://github.com/ShervanGharari/candex
-    @ author's email id:       sh.gharari@gmail.com
-    @license:                  Apache2
-
-    This function funcitons read different grids and sum them up based on the
-    weight provided to aggregate them over a larger area
-    
-    Arguments
-    ---------
-    case: value [1,]
-            1 is for 3-dimensional variable with 1-dimentional lat and lon
-            2 is for 3-dimensional varibale with 2-dimentional lat and lon
-            3 is for 2-dimensional variable with 1-dimentional lat and lon (time series)
-    lat_target: lat value [1,]
-    lon_target: lon value [1,]
-    name_of_nc: full or part of nc file(s) name including nc, string, example 'XXX/*01*.nc'
-    name_of_variable: name of the varibale, string
-    name_of_time_dim: name of time dimension, string
-    name_of_lat_var: name of lat variable, string
-    name_of_lon_var: name of lon variable, string
-    name_of_lat_dim: name of lat dimension, string
-    name_of_lon_dim: name of lon dimension, string
-    
-    Returns
-    -------
-    data: a numpy array that has the read value of the NetCDF file for the lats, lons and weights
-    """
-    names_all = glob.glob(name_of_nc)
-    names_all.sort()
-    data = None
-
-    # for to read on variouse nc files for target lat lon
-    for names in names_all:
-        
-        da = xr.open_dataset(names, decode_times=False)
-        
-        # case 1, the varibale is 3-dimensional and lat and lon are one-dimnesional
-        if case ==1:
-            # finding the index for the lat for target_lat
-            da_lat = da[name_of_lat_var] # reading the lat variable
-            temp = np.array(abs(da_lat-lat_target)) # finding the distance to target_lat
-            index_target_lat = np.array([temp.argmin()]) # finding the closest index to target_lat
-            
-            # finding the index for the lon for target_lon
-            da_lon = da[name_of_lon_var] # reading the lon variable
-            temp = np.array(abs(da_lon-lon_target)) # finding the distnace to target_lon
-            index_target_lon = np.array([temp.argmin()]) # finding the closest index to target_lon
-            
-            # making sure that the lat and lon are only one value and not two
-            index_target_lon = index_target_lon[0]
-            index_target_lat = index_target_lat[0]
-            
-            # porder of dimensions for the target variable
-            dataset = da[name_of_variable]
-            order_time_dim = dataset.dims.index(name_of_time_dim)
-            order_lat_dim = dataset.dims.index(name_of_lat_dim)
-            order_lon_dim = dataset.dims.index(name_of_lon_dim)
-            
-            if order_time_dim == 0: # such as the varibaele dimension is time, lat, lon
-                data_temp = dataset [:,index_target_lat,index_target_lon]
-            if order_time_dim == 2: # such as the varibaele dimension is lon, lat, time
-                data_temp = dataset [index_target_lon,index_target_lat,:]
-
-        # case 2, the varibale is 3-dimensional and lat and lon are 2-dimentional such as rotated lat lon
-        if case ==2:
-            # finding the index for the lat
-            da_lat = da[name_of_lat_var]
-            da_lon = da[name_of_lon_var]
-            temp = np.array(abs(da_lat-lat_target)+abs(da_lon-lon_target))
-            ind = np.unravel_index(np.argmin(temp, axis=None), temp.shape)
-            ind = np.array(ind)
-            
-            # order of dimensions for the target variable
-            dataset = da[name_of_variable]
-            order_time_dim = dataset.dims.index(name_of_time_dim)
-            order_lat_dim = dataset.dims.index(name_of_lat_dim)
-            order_lon_dim = dataset.dims.index(name_of_lon_dim)
-            
-            if order_time_dim == 0: # such as the varibaele dimension is time, lat, lon
-                index_target_lat = ind[0]
-                index_target_lon = ind[1]
-                data_temp = dataset [:,index_target_lat,index_target_lon]
-            if order_time_dim == 2: # such as the varibaele dimension is lon, lat, time
-                index_target_lat = ind[1]
-                index_target_lon = ind[0]
-                data_temp = dataset [index_target_lon,index_target_lat,:]
-
-        # case 3, the varibale is 2-dimnesional and lat and lon are 1-dimensional such as n time or time n
-        if case ==3:
-            da_lat = da[name_of_lat_var]
-            da_lon = da[name_of_lon_var]
-            temp = np.array(abs(da_lat-lat_target)+abs(da_lon-lon_target))
-            ind = np.unravel_index(np.argmin(temp, axis=None), temp.shape)
-            ind = np.array(ind)
-            ind = ind[0]
-            
-            # order of dimensions for the target variable
-            dataset = da[name_of_variable]
-            order_time_dim = dataset.dims.index(name_of_time_dim)
-            
-            if order_time_dim == 0: # such as the varibaele dimension is time, n
-                index_target_n = ind
-                data_temp = dataset [:,index_target_n]
-            if order_time_dim == 1: # such as the varibaele dimension is n, time
-                index_target_n = ind
-                data_temp = dataset [index_target_n,:]
-        
-        # getting the length of time dimension
-        time_steps = da.dims[name_of_time_dim]
-        
-        # put the read data into the data_temp
-        data_temp = np.array(data_temp)
-        data_temp = data_temp.reshape((time_steps, ))
-
-        # append the data_temp
-        if data is not None:
-            data = np.append(data, data_temp)
-        else:
-            data = data_temp
-            
-    return data
-
-
-def area_ave(case,
-             lat, lon, w,
-             name_of_nc, name_of_variable,
-             name_of_time_dim,
-             name_of_lat_dim, name_of_lon_dim,
-             name_of_lat_var, name_of_lon_var):
-    """
-    @ author:                  Shervan Gharari
-    @ Github:                  https://github.com/ShervanGharari/candex
-    @ author's email id:       sh.gharari@gmail.com
-    @license:                  Apache2
-
-    This function funcitons read different grids and sum them up based on the
-    weight provided to aggregate them over a larger area
-    
-    Arguments
-    ---------
-    case: value [1,]
-            1 is for 3-dimensional variable with 1-dimentional lat and lon
-            2 is for 3-dimensional varibale with 2-dimentional lat and lon
-            3 is for 2-dimensional variable with 1-dimentional lat and lon (time series)
-    lat: lat value [1,]
-    lon: lon value [1,]
-    w: wieght[1,]
-    name_of_nc: full or part of nc file(s) name including nc, string, example 'XXX/*01*.nc'
-    name_of_variable: name of the varibale, string
-    name_of_time_dim: name of time dimension, string
-    name_of_lat_dim: name of lat dimension, string
-    name_of_lon_dim: name of lon dimension, string
-    name_of_lat_var: name of lat variable, string
-    name_of_lon_var: name of lon variable, string
-    
-    Returns
-    -------
-    data: a numpy array that has the read value of the NetCDF file for the lats, lons and weights
-    """
-    
-    data = None
-    #print(w, lat, lon)
-    if lat.size ==1: # only one entry to the funciton (one lat, one lon and one W)
-        data_temp = read_value_lat_lon_nc(case,
-                                          lat, lon, name_of_nc,
-                                          name_of_variable, name_of_time_dim,
-                                          name_of_lat_dim, name_of_lon_dim,
-                                          name_of_lat_var, name_of_lon_var)
-        data = data_temp * w
-    else:
-        for i in np.arange(lat.shape[0]):# itterate over target values
-            data_temp = read_value_lat_lon_nc(case,
-                                              lat[i], lon[i], name_of_nc,
-                                              name_of_variable, name_of_time_dim,
-                                              name_of_lat_dim, name_of_lon_dim,
-                                              name_of_lat_var, name_of_lon_var)
-            if i == 0: # multiply the read value with their weight and sum
-                data = data_temp * w[i]
-            else:
-                data = data + data_temp * w[i]
-    return data
-    
-    
-    # this part if a data frame is directly fed to the function
-    #for i in range(0, len(lat)): # itterate over target values
-    #    data_temp = read_value_lat_lon_nc(case,
-    #                                      lat.iloc[i], lon.iloc[i], name_of_nc,
-    #                                      name_of_variable, name_of_time_dim,
-    #                                      name_of_lat_dim, name_of_lon_dim,
-    #                                      name_of_lat_var, name_of_lon_var)
-    #    if i is 0: # multiply the read value with their weight and sum
-    #        data = data_temp * w.iloc[i]
-    #    else:
-    #        data = data + data_temp * w.iloc[i]
-    #return data
-
 
 def box(name_or_singleframe_shp,buffer_value):
     """
@@ -526,6 +528,8 @@ def box(name_or_singleframe_shp,buffer_value):
     @license:                  Apache2
 
     This function funcitons calculates the bounding box of a given shapefile
+    If the name of a .shp file is given, the bounding box is read from the header of the shapefile without reading
+    the shapes and the attributes
     Arguments
     ---------
         name_or_singleframe_shp: full or part of shp file(s) name including .shp, string, or a geopandas data frame
@@ -534,7 +538,20 @@ def box(name_or_singleframe_shp,buffer_value):
     -------
         box_values: which return [minlat maxlat minlon maxlon]
     """
+    if type(name_or_singleframe_shp) is str and name_or_singleframe_shp.lower().endswith('.shp'):
+        import shapefile # PyShp library
+        print('str')
+        # reading only the header of the shapefile, bbox is [minlon minlat maxlon maxlat]
+        with shapefile.Reader(name_or_singleframe_shp) as r:
+            if len(r) > 1:
+                print('WARNING: your shapefile has more than one value! in box funcitons')
+            A = r.bbox
+        # adding buffer manually
+        box_values = np.array([A[1]-buffer_value, A[3]+buffer_value,\
+                               A[0]-buffer_value, A[2]+buffer_value])
+        return box_values
     if type(name_or_singleframe_shp) is str:
+        import geopandas as gpd
         shp_temp = gpd.read_file(name_or_singleframe_shp)
         print('str')
     else:
@@ -551,84 +568,6 @@ def box(name_or_singleframe_shp,buffer_value):
     return box_values
 
 
-def write_netcdf(nc_file_name, variable_data, variable_name, varibale_unit,
-                 varibale_long_name, lon_data, lat_data, ID_data,
-                 variable_time, starting_date_string,
-                 time_dim_length, n_dim_length):
-    """
-    @ author:                  Shervan Gharari
-    @ Github:                  https://github.com/ShervanGharari/candex
-    @ author's email id:       sh.gharari@gmail.com
-    @license:                  Apache2
-
-    This function takes in a single array of data with an ID and it lat and lon value and save it as nc file
-    
-    Arguments
-    ---------
-    nc_file_name: the name of the file to be saved, string
-    variable_data: the values of the variable to be saved, np array [n,time]
-    variable_name: the name of the variable to be saved, string
-    varibale_unit: the name of the units to be saved, string
-    varibale_long_name: the long name of the varibale to be saved, string
-    lon_data: lon data [n,]
-    lat_data: lat data [n,]
-    ID_data: ID data [n,]
-    variable_time: the name of the varibale time, string
-    starting_date_string: the starting point of the NetCDF file "hours since 2010-01-01 00:00:00"
-    time_dim_length: the length of the time dimension [1,]
-    n_dim_length: the length of the n dimension [1,]
-    """
-
-    with nc4.Dataset(nc_file_name, "w", format="NETCDF4") as ncid:
-        
-        dimid_N = ncid.createDimension('n', n_dim_length)  # only write one variable
-        # dimid_T = ncid.createDimension('time', time_dim_length)
-        dimid_T = ncid.createDimension('time', None)
-
-        # Variables
-        time_varid = ncid.createVariable('time', 'i4', ('time', ))
-        # Attributes
-        time_varid.long_name = 'time'
-        time_varid.units = starting_date_string  # e.g. 'days since 1900-01-01 00:00'
-        time_varid.calendar = 'gregorian'
-        time_varid.standard_name = 'time'
-        time_varid.axis = 'T'
-        # Write data
-        time_varid[:] = variable_time
-
-        # Variables
-        lat_varid = ncid.createVariable('lat', 'f8', ('n', ))
-        lon_varid = ncid.createVariable('lon', 'f8', ('n', ))
-        ID_varid = ncid.createVariable('ID', 'f8', ('n', ))
-        # Attributes
-        lat_varid.long_name = 'latitude'
-        lon_varid.long_name = 'longitude'
-        ID_varid.long_name = 'ID'
-        lat_varid.units = 'degrees_north'
-        lon_varid.units = 'degrees_east'
-        ID_varid.units = '1'
-        lat_varid.standard_name = 'latitude'
-        lon_varid.standard_name = 'longitude'
-        # Write data
-        lat_varid[:] = lat_data
-        lon_varid[:] = lon_data
-        ID_varid[:] = ID_data
-
-        # Variable
-        data_varid = ncid.createVariable(variable_name, 'f8', ('n','time', ))
-        # Attributes
-        data_varid.long_name = varibale_long_name
-        data_varid.units = varibale_unit
-        # Write data
-        data_varid[:] = variable_data
-
-        ##
-        ncid.Conventions = 'CF-1.6'
-        ncid.License = 'The data were written by Shervan Gharari. Under Apache2.'
-        ncid.history = 'Created ' + time.ctime(time.time())
-        ncid.source = 'Written by script from library of Shervan Gharari (https://github.com/ShervanGharari/candex).'
-
-        
 def spatial_overlays(df1, df2, how='intersection', reproject=True):
     """Perform spatial overlay between two polygons.
 
@@ -658,6 +597,8 @@ def spatial_overlays(df1, df2, how='intersection', reproject=True):
         resulting from the overlay
 
     """
+    import geopandas as gpd
+
     df1 = df1.copy()
     df2 = df2.copy()
     df1['geometry'] = df1.geometry.buffer(0)
@@ -0,0 +1,953 @@
+# the numeric remapping path of candex: reading the NetCDF files, remapping them with the weights of the
+# intersection and writing the results. It does not need the geometry packages (geopandas, shapely, pyshp), the
+# NetCDF packages are imported on first use
+import glob
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+def read_value_lat_lon_nc(case,
+                          lat_target, lon_target, name_of_nc,
+                          name_of_variable, name_of_time_dim,
+                          name_of_lat_var, name_of_lon_var,
+                          name_of_lat_dim, name_of_lon_dim):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function funcitons read different grids and sum them up based on the
+    weight provided to aggregate them over a larger area
+    
+    Arguments
+    ---------
+    case: value [1,]
+            1 is for 3-dimensional variable with 1-dimentional lat and lon
+            2 is for 3-dimensional varibale with 2-dimentional lat and lon
+            3 is for 2-dimensional variable with 1-dimentional lat and lon (time series)
+    lat_target: lat value [1,]
+    lon_target: lon value [1,]
+    name_of_nc: full or part of nc file(s) name including nc, string, example 'XXX/*01*.nc'
+    name_of_variable: name of the varibale, string
+    name_of_time_dim: name of time dimension, string
+    name_of_lat_var: name of lat variable, string
+    name_of_lon_var: name of lon variable, string
+    name_of_lat_dim: name of lat dimension, string
+    name_of_lon_dim: name of lon dimension, string
+    
+    Returns
+    -------
+    data: a numpy array that has the read value of the NetCDF file for the lats, lons and weights
+    """
+    import xarray as xr
+
+    names_all = glob.glob(name_of_nc)
+    names_all.sort()
+    data = None
+
+    # for to read on variouse nc files for target lat lon
+    for names in names_all:
+        
+        da = xr.open_dataset(names, decode_times=False)
+        
+        # case 1, the varibale is 3-dimensional and lat and lon are one-dimnesional
+        if case ==1:
+            # finding the index for the lat for target_lat
+            da_lat = da[name_of_lat_var] # reading the lat variable
+            temp = np.array(abs(da_lat-lat_target)) # finding the distance to target_lat
+            index_target_lat = np.array([temp.argmin()]) # finding the closest index to target_lat
+            
+            # finding the index for the lon for target_lon
+            da_lon = da[name_of_lon_var] # reading the lon variable
+            temp = np.array(abs(da_lon-lon_target)) # finding the distnace to target_lon
+            index_target_lon = np.array([temp.argmin()]) # finding the closest index to target_lon
+            
+            # making sure that the lat and lon are only one value and not two
+            index_target_lon = index_target_lon[0]
+            index_target_lat = index_target_lat[0]
+            
+            # porder of dimensions for the target variable
+            dataset = da[name_of_variable]
+            order_time_dim = dataset.dims.index(name_of_time_dim)
+            order_lat_dim = dataset.dims.index(name_of_lat_dim)
+            order_lon_dim = dataset.dims.index(name_of_lon_dim)
+            
+            if order_time_dim == 0: # such as the varibaele dimension is time, lat, lon
+                data_temp = dataset [:,index_target_lat,index_target_lon]
+            if order_time_dim == 2: # such as the varibaele dimension is lon, lat, time
+                data_temp = dataset [index_target_lon,index_target_lat,:]
+
+        # case 2, the varibale is 3-dimensional and lat and lon are 2-dimentional such as rotated lat lon
+        if case ==2:
+            # finding the index for the lat
+            da_lat = da[name_of_lat_var]
+            da_lon = da[name_of_lon_var]
+            temp = np.array(abs(da_lat-lat_target)+abs(da_lon-lon_target))
+            ind = np.unravel_index(np.argmin(temp, axis=None), temp.shape)
+            ind = np.array(ind)
+            
+            # order of dimensions for the target variable
+            dataset = da[name_of_variable]
+            order_time_dim = dataset.dims.index(name_of_time_dim)
+            order_lat_dim = dataset.dims.index(name_of_lat_dim)
+            order_lon_dim = dataset.dims.index(name_of_lon_dim)
+            
+            if order_time_dim == 0: # such as the varibaele dimension is time, lat, lon
+                index_target_lat = ind[0]
+                index_target_lon = ind[1]
+                data_temp = dataset [:,index_target_lat,index_target_lon]
+            if order_time_dim == 2: # such as the varibaele dimension is lon, lat, time
+                index_target_lat = ind[1]
+                index_target_lon = ind[0]
+                data_temp = dataset [index_target_lon,index_target_lat,:]
+
+        # case 3, the varibale is 2-dimnesional and lat and lon are 1-dimensional such as n time or time n
+        if case ==3:
+            da_lat = da[name_of_lat_var]
+            da_lon = da[name_of_lon_var]
+            temp = np.array(abs(da_lat-lat_target)+abs(da_lon-lon_target))
+            ind = np.unravel_index(np.argmin(temp, axis=None), temp.shape)
+            ind = np.array(ind)
+            ind = ind[0]
+            
+            # order of dimensions for the target variable
+            dataset = da[name_of_variable]
+            order_time_dim = dataset.dims.index(name_of_time_dim)
+            
+            if order_time_dim == 0: # such as the varibaele dimension is time, n
+                index_target_n = ind
+                data_temp = dataset [:,index_target_n]
+            if order_time_dim == 1: # such as the varibaele dimension is n, time
+                index_target_n = ind
+                data_temp = dataset [index_target_n,:]
+        
+        # getting the length of time dimension
+        time_steps = da.dims[name_of_time_dim]
+        
+        # put the read data into the data_temp
+        data_temp = np.array(data_temp)
+        data_temp = data_temp.reshape((time_steps, ))
+
+        # append the data_temp
+        if data is not None:
+            data = np.append(data, data_temp)
+        else:
+            data = data_temp
+            
+    return data
+
+
+def point_weights(case, da, lat_target, lon_target, name_of_lat_var, name_of_lon_var,
+                  method='nearest', n_neighbours=4, power=2):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function finds the neighbouring grids of the NetCDF file and their weights for many target points at once,
+    so that the value of every target point is the weighted sum of the values of its neighbouring grids
+
+    Arguments
+    ---------
+    case: value [1,]
+            1 is for 3-dimensional variable with 1-dimentional lat and lon
+            2 is for 3-dimensional varibale with 2-dimentional lat and lon
+            3 is for 2-dimensional variable with 1-dimentional lat and lon (time series)
+    da: xarray dataset, the opened NetCDF file
+    lat_target: lat values of the target points [p,]
+    lon_target: lon values of the target points [p,]
+    name_of_lat_var: name of lat variable, string
+    name_of_lon_var: name of lon variable, string
+    method: 'nearest' for the closest grid, 'bilinear' for bilinear interpolation between the four surrounding grids
+            (only case 1) or 'idw' for inverse distance weighting of the n_neighbours closest grids. Default = 'nearest'
+            With 'bilinear' the weights of the target points outside of the grid are NaN so their values are NaN,
+            'nearest' and 'idw' use the closest grids however far they are
+    n_neighbours: the number of the closest grids for 'idw' [1,]. Default = 4
+    power: the power of the distance for 'idw' [1,]. Default = 2
+
+    Returns
+    -------
+    index: a dictionary with the name of the dimensions as key and the index of the grids [n,] for that dimension as value
+    index_target: the index of the target point for every grid [n,]
+    w: the weight of every grid [n,]
+    """
+    lat_target = np.array(lat_target, dtype=float).reshape(-1)
+    lon_target = np.array(lon_target, dtype=float).reshape(-1)
+    n_target = lat_target.size
+
+    if method == 'nearest':
+        index = nc_cell_index(case, da, lat_target, lon_target, name_of_lat_var, name_of_lon_var)
+        return index, np.arange(n_target), np.ones(n_target)
+
+    da_lat = np.array(da[name_of_lat_var], dtype=float)
+    da_lon = np.array(da[name_of_lon_var], dtype=float)
+
+    if method == 'bilinear':
+        if case != 1:
+            raise ValueError('bilinear interpolation is only possible for case 1, use idw instead')
+        index_lat, t = _interpolation_index(da_lat, lat_target)
+        index_lon, u = _interpolation_index(da_lon, lon_target)
+        if np.isnan(t).any() or np.isnan(u).any():
+            print('WARNING: some of the target points are outside of the grid and their values are NaN! in point_weights')
+        # the four surrounding grids and their weights
+        index = {da[name_of_lat_var].dims[0]: np.concatenate((index_lat[0], index_lat[1], index_lat[0], index_lat[1])),
+                 da[name_of_lon_var].dims[0]: np.concatenate((index_lon[0], index_lon[0], index_lon[1], index_lon[1]))}
+        w = np.concatenate(((1-t)*(1-u), t*(1-u), (1-t)*u, t*u))
+        return index, np.tile(np.arange(n_target), 4), w
+
+    if method == 'idw':
+        # the lat and lon of all the grids with the same shape
+        if case == 1:
+            da_lat, da_lon = np.meshgrid(da_lat, da_lon, indexing='ij')
+            dims = (da[name_of_lat_var].dims[0], da[name_of_lon_var].dims[0])
+        else:
+            dims = da[name_of_lat_var].dims
+        n_neighbours = min(n_neighbours, da_lat.size)
+        flat_index = np.zeros((n_target, n_neighbours), dtype=int)
+        w = np.zeros((n_target, n_neighbours))
+        for i in np.arange(n_target):
+            distance = np.sqrt((da_lat - lat_target[i])**2 + (da_lon - lon_target[i])**2).reshape(-1)
+            closest = np.argpartition(distance, n_neighbours - 1)[:n_neighbours]
+            flat_index[i] = closest
+            if distance[closest].min() == 0: # the target point is on a grid
+                w[i] = distance[closest] == 0
+            else:
+                w[i] = 1 / distance[closest]**power
+            w[i] = w[i] / w[i].sum()
+        index = dict(zip(dims, np.unravel_index(flat_index.reshape(-1), da_lat.shape)))
+        return index, np.repeat(np.arange(n_target), n_neighbours), w.reshape(-1)
+
+    raise ValueError('method should be nearest, bilinear or idw')
+
+
+def _interpolation_index(grid, target):
+    """
+    the index of the two grids around every target value and the distance from the first one, between 0 and 1, for
+    a 1-dimensional lat or lon that can be increasing or decreasing. The distance is NaN for the target values outside
+    of the grid
+    """
+    order = np.argsort(grid)
+    grid_sorted = grid[order]
+    i = np.clip(np.searchsorted(grid_sorted, target) - 1, 0, grid.size - 2)
+    t = np.clip((target - grid_sorted[i]) / (grid_sorted[i + 1] - grid_sorted[i]), 0, 1)
+    t[(target < grid_sorted[0]) | (target > grid_sorted[-1])] = np.nan
+    return (order[i], order[i + 1]), t
+
+
+def read_value_lat_lon_nc_batch(case,
+                                lat_target, lon_target, name_of_nc,
+                                name_of_variable, name_of_time_dim,
+                                name_of_lat_var, name_of_lon_var,
+                                method='nearest', prefetch=1):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function reads the values of many target points, such as gauges or stations, from the NetCDF file(s). The
+    neighbouring grids and their weights are found once (see point_weights) and every file is read only once for all
+    the target points, instead of once per target point as in read_value_lat_lon_nc
+
+    Arguments
+    ---------
+    case: value [1,]
+            1 is for 3-dimensional variable with 1-dimentional lat and lon
+            2 is for 3-dimensional varibale with 2-dimentional lat and lon
+            3 is for 2-dimensional variable with 1-dimentional lat and lon (time series)
+    lat_target: lat values [p,]
+    lon_target: lon values [p,]
+    name_of_nc: full or part of nc file(s) name including nc, string, example 'XXX/*01*.nc'
+    name_of_variable: name of the varibale, string
+    name_of_time_dim: name of time dimension, string
+    name_of_lat_var: name of lat variable, string
+    name_of_lon_var: name of lon variable, string
+    method: 'nearest', 'bilinear' or 'idw', see point_weights. Default = 'nearest'
+    prefetch: the number of the next nc files that are read in the background [1,]. Default = 1
+
+    Returns
+    -------
+    data: a numpy array that has the read value of the NetCDF file(s) for the target points [time,p]
+    """
+    import xarray as xr
+
+    names_all = glob.glob(name_of_nc)
+    names_all.sort()
+    if not names_all:
+        raise ValueError('no nc file is found for ' + name_of_nc)
+    data = []
+    n_target = np.size(lat_target)
+
+    # the grids and weights are found once from the first file
+    with xr.open_dataset(names_all[0], decode_times=False) as da:
+        index, index_target, w = point_weights(case, da, lat_target, lon_target,
+                                               name_of_lat_var, name_of_lon_var, method=method)
+
+    # for to read on variouse nc files for all the target lat lon, the next files are read in the background
+    files = prefetch_map(lambda names: nc_read_file(names, index, name_of_variable, name_of_time_dim),
+                         names_all, prefetch=prefetch)
+    for values, _, _, _ in files:
+        data.append(weighted_sum(values, index_target, w, n_target).T)
+
+    return np.concatenate(data, axis=0)
+
+
+def area_ave(case,
+             lat, lon, w,
+             name_of_nc, name_of_variable,
+             name_of_time_dim,
+             name_of_lat_dim, name_of_lon_dim,
+             name_of_lat_var, name_of_lon_var):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function funcitons read different grids and sum them up based on the
+    weight provided to aggregate them over a larger area
+    
+    Arguments
+    ---------
+    case: value [1,]
+            1 is for 3-dimensional variable with 1-dimentional lat and lon
+            2 is for 3-dimensional varibale with 2-dimentional lat and lon
+            3 is for 2-dimensional variable with 1-dimentional lat and lon (time series)
+    lat: lat value [1,]
+    lon: lon value [1,]
+    w: wieght[1,]
+    name_of_nc: full or part of nc file(s) name including nc, string, example 'XXX/*01*.nc'
+    name_of_variable: name of the varibale, string
+    name_of_time_dim: name of time dimension, string
+    name_of_lat_dim: name of lat dimension, string
+    name_of_lon_dim: name of lon dimension, string
+    name_of_lat_var: name of lat variable, string
+    name_of_lon_var: name of lon variable, string
+    
+    Returns
+    -------
+    data: a numpy array that has the read value of the NetCDF file for the lats, lons and weights
+    """
+    
+    data = None
+    #print(w, lat, lon)
+    if lat.size ==1: # only one entry to the funciton (one lat, one lon and one W)
+        data_temp = read_value_lat_lon_nc(case,
+                                          lat, lon, name_of_nc,
+                                          name_of_variable, name_of_time_dim,
+                                          name_of_lat_dim, name_of_lon_dim,
+                                          name_of_lat_var, name_of_lon_var)
+        data = data_temp * w
+    else:
+        for i in np.arange(lat.shape[0]):# itterate over target values
+            data_temp = read_value_lat_lon_nc(case,
+                                              lat[i], lon[i], name_of_nc,
+                                              name_of_variable, name_of_time_dim,
+                                              name_of_lat_dim, name_of_lon_dim,
+                                              name_of_lat_var, name_of_lon_var)
+            if i == 0: # multiply the read value with their weight and sum
+                data = data_temp * w[i]
+            else:
+                data = data + data_temp * w[i]
+    return data
+    
+    
+    # this part if a data frame is directly fed to the function
+    #for i in range(0, len(lat)): # itterate over target values
+    #    data_temp = read_value_lat_lon_nc(case,
+    #                                      lat.iloc[i], lon.iloc[i], name_of_nc,
+    #                                      name_of_variable, name_of_time_dim,
+    #                                      name_of_lat_dim, name_of_lon_dim,
+    #                                      name_of_lat_var, name_of_lon_var)
+    #    if i is 0: # multiply the read value with their weight and sum
+    #        data = data_temp * w.iloc[i]
+    #    else:
+    #        data = data + data_temp * w.iloc[i]
+    #return data
+
+
+def weights_intersection(shp_int, name_of_ID='IDS1', name_of_lat='S_2_lat', name_of_lon='S_2_lon',
+                         name_of_weight='AP1N'):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function takes the result of intersection_shp and returns the remapping weights as numpy arrays. Every row
+    of the intersection is a pair of a target shape (from shapefile 1) and a source cell (from the NetCDF shapefile)
+
+    Arguments
+    ---------
+    shp_int: data frame, the result of intersection_shp
+    name_of_ID: name of the field with the ID of the target shapes, string. Default = 'IDS1'
+    name_of_lat: name of the field with the lat of the source cells, string. Default = 'S_2_lat'
+    name_of_lon: name of the field with the lon of the source cells, string. Default = 'S_2_lon'
+    name_of_weight: name of the field with the weights, string. Default = 'AP1N'
+
+    Returns
+    -------
+    ID_target: the unique IDs of the target shapes [k,]
+    index_target: the index of the target shape in ID_target for every row of the intersection [n,]
+    lat: the lat of the source cell for every row of the intersection [n,]
+    lon: the lon of the source cell for every row of the intersection [n,]
+    w: the weight for every row of the intersection [n,]
+    """
+    ID = np.array(shp_int[name_of_ID])
+    ID_target, index_target = np.unique(ID, return_inverse=True)
+    index_target = index_target.reshape(-1) # making sure the index is 1D for all numpy versions
+    lat = np.array(shp_int[name_of_lat], dtype=float)
+    lon = np.array(shp_int[name_of_lon], dtype=float)
+    w = np.array(shp_int[name_of_weight], dtype=float)
+    return ID_target, index_target, lat, lon, w
+
+
+def weights_aggregate(shp_int, mapping, name_of_ID='IDS1', name_of_child='child', name_of_parent='parent',
+                      fields=('S_2_lat', 'S_2_lon')):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function derives the weights of coarser target shapes, such as a higher level of nested catchments, from the
+    weights of the finest target shapes and the parent of every finest shape, without a new intersection. The
+    intersected area (AINT) of the children in every source cell is summed for the parent and AP1N and AP2N are
+    normalized again. The parent ID is written in the field name_of_ID, so the result can be aggregated again to the
+    next level and remapped with area_ave_multi(..., name_of_ID=name_of_ID). The positional IDS1 of the finest shapes
+    has no meaning for the parents and is not kept, unless name_of_ID is 'IDS1'.
+    The child to parent tables of nested catchments, such as HydroBASINS, use an ID field of the shapefile and not
+    IDS1, this field should be kept in the intersection, for example
+    intersection_shp(shp_1, shp_2, weights_only=True, fields=('S_1_HYBAS_ID', 'S_2_lat', 'S_2_lon')) and
+    weights_aggregate(shp_int, mapping, name_of_ID='S_1_HYBAS_ID')
+
+    Arguments
+    ---------
+    shp_int: data frame, the result of intersection_shp (with weights_only True or False) for the finest shapes
+    mapping: data frame with the child and parent IDs, or a dictionary {child ID: parent ID}
+    name_of_ID: name of the field with the ID of the target shapes in shp_int, such as 'S_1_HYBAS_ID', string.
+                Default = 'IDS1'
+    name_of_child: name of the field with the child IDs in mapping, string. Default = 'child'
+    name_of_parent: name of the field with the parent IDs in mapping, string. Default = 'parent'
+    fields: the fields of the source cells that are kept, list of strings. Default = ('S_2_lat', 'S_2_lon')
+
+    Returns
+    -------
+    result: a data frame with the parent ID (in the field name_of_ID), IDS2, AINT, AP1N, AP2N and the given fields
+    """
+    import pandas as pd
+
+    if not isinstance(mapping, dict):
+        mapping = dict(zip(mapping[name_of_child], mapping[name_of_parent]))
+
+    # the parent of every row, the rows without a parent are removed
+    parent = pd.Series(np.array(shp_int[name_of_ID])).map(mapping)
+    if parent.isnull().any():
+        print('WARNING: some of the shapes have no parent in the mapping and are removed! in weights_aggregate')
+    column_names = ['IDS2'] + [name for name in fields if name in shp_int.columns]
+    result = pd.DataFrame(shp_int[column_names + ['AINT']]).reset_index(drop=True)
+    result[name_of_ID] = parent.values
+    result = result.loc[parent.notnull().values]
+
+    # summing the intersected area of the children for every parent and source cell
+    result = result.groupby([name_of_ID] + column_names, sort=False, as_index=False)['AINT'].sum()
+
+    # normalizing the area for every parent and every source cell
+    result['AP1N'] = result['AINT'] / result.groupby(name_of_ID)['AINT'].transform('sum')
+    result['AP2N'] = result['AINT'] / result.groupby('IDS2')['AINT'].transform('sum')
+
+    return result[[name_of_ID, 'IDS2', 'AINT', 'AP1N', 'AP2N'] + column_names[1:]]
+
+
+def nc_cell_index(case, da, lat, lon, name_of_lat_var, name_of_lon_var):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function finds the index of the closest grid of the NetCDF file for many lat and lon at once, in the same way
+    read_value_lat_lon_nc does it for one lat and lon. The index is returned per dimension of the lat and lon variables
+    so it can be directly used for the selection of the values of a variable with any order of dimensions
+
+    Arguments
+    ---------
+    case: value [1,]
+            1 is for 3-dimensional variable with 1-dimentional lat and lon
+            2 is for 3-dimensional varibale with 2-dimentional lat and lon
+            3 is for 2-dimensional variable with 1-dimentional lat and lon (time series)
+    da: xarray dataset, the opened NetCDF file
+    lat: lat values [n,]
+    lon: lon values [n,]
+    name_of_lat_var: name of lat variable, string
+    name_of_lon_var: name of lon variable, string
+
+    Returns
+    -------
+    index: a dictionary with the name of the dimensions as key and the index [n,] for that dimension as value
+    """
+    lat = np.array(lat, dtype=float).reshape(-1)
+    lon = np.array(lon, dtype=float).reshape(-1)
+    da_lat = np.array(da[name_of_lat_var])
+    da_lon = np.array(da[name_of_lon_var])
+
+    # case 1, lat and lon are one-dimensional and independent from each other
+    if case == 1:
+        index_lat = np.abs(da_lat[np.newaxis, :] - lat[:, np.newaxis]).argmin(axis=1)
+        index_lon = np.abs(da_lon[np.newaxis, :] - lon[:, np.newaxis]).argmin(axis=1)
+        return {da[name_of_lat_var].dims[0]: index_lat,
+                da[name_of_lon_var].dims[0]: index_lon}
+
+    # case 2 and 3, lat and lon share the same dimensions, finding the closest point one by one
+    index = np.zeros(lat.shape, dtype=int)
+    for i in np.arange(lat.shape[0]):
+        temp = np.abs(da_lat - lat[i]) + np.abs(da_lon - lon[i])
+        index[i] = np.argmin(temp, axis=None)
+    index = np.unravel_index(index, da_lat.shape)
+    return dict(zip(da[name_of_lat_var].dims, index))
+
+
+def nc_cell_values(da, index, name_of_variable, name_of_time_dim):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function reads the values of a variable for the grids given by nc_cell_index in one go
+
+    Arguments
+    ---------
+    da: xarray dataset, the opened NetCDF file
+    index: a dictionary with the name of the dimensions as key and the index [n,] as value, from nc_cell_index
+    name_of_variable: name of the varibale, string
+    name_of_time_dim: name of time dimension, string
+
+    Returns
+    -------
+    values: a numpy array with the values of the variable [time,n]
+    """
+    import xarray as xr
+
+    dataset = da[name_of_variable]
+    dataset = dataset.isel({dim: xr.DataArray(value, dims='candex_cell') for dim, value in index.items()})
+    dataset = dataset.transpose(name_of_time_dim, 'candex_cell')
+    return np.array(dataset, dtype=float)
+
+
+def nc_read_file(name_of_nc, index, name_of_variable, name_of_time_dim):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function opens one NetCDF file, reads the values of a variable for the grids given by nc_cell_index and the
+    time, and closes the file
+
+    Arguments
+    ---------
+    name_of_nc: the name of the nc file, string
+    index: a dictionary with the name of the dimensions as key and the index [n,] as value, from nc_cell_index
+    name_of_variable: name of the varibale, string
+    name_of_time_dim: name of time dimension, string
+
+    Returns
+    -------
+    values: a numpy array with the values of the variable [time,n]
+    time_file: the values of the time variable [time,], None if there is no time variable
+    time_units: the units of the time variable, string
+    time_calendar: the calendar of the time variable, string
+    """
+    import xarray as xr
+
+    with xr.open_dataset(name_of_nc, decode_times=False) as da:
+        values = nc_cell_values(da, index, name_of_variable, name_of_time_dim)
+        if name_of_time_dim not in da.variables:
+            return values, None, None, None
+        time_file = np.array(da[name_of_time_dim])
+        time_units = da[name_of_time_dim].attrs.get('units')
+        time_calendar = da[name_of_time_dim].attrs.get('calendar', 'standard')
+    return values, time_file, time_units, time_calendar
+
+
+def prefetch_map(function, items, prefetch=1):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function applies a function, such as reading a file, to the items in order and returns the results one by
+    one. The function is applied to the next items in background threads while the current result is used, so that
+    reading the files and the calculations overlap. At most prefetch results are waiting at any time
+
+    Arguments
+    ---------
+    function: the function to apply to every item
+    items: list of the items, such as the names of the nc files
+    prefetch: the number of the items that are done in the background [1,]. Default = 1, 0 for no background threads
+
+    Returns
+    -------
+    the results of the function for every item, in the order of the items (generator)
+    """
+    if prefetch < 1:
+        for item in items:
+            yield function(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=prefetch) as executor:
+        futures = deque()
+        for item in items:
+            futures.append(executor.submit(function, item))
+            if len(futures) > prefetch:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+
+def weighted_sum(values, index_target, w, n_target):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function multiplies the values of the source cells with their weights and sums them for every target shape
+
+    Arguments
+    ---------
+    values: the values of the source cell for every row of the intersection [time,n]
+    index_target: the index of the target shape for every row of the intersection [n,]
+    w: the weight for every row of the intersection [n,]
+    n_target: the number of target shapes [1,]
+
+    Returns
+    -------
+    data: a numpy array with the weighted sum for every target shape [k,time]
+    """
+    data = np.zeros((n_target, values.shape[0]))
+    np.add.at(data, index_target, (values * w).T)
+    return data
+
+
+def weighted_sum_masked(values, index_target, w, n_target, min_coverage=0):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function is the same as weighted_sum but skips the missing (NaN) values of the source cells. For every time
+    step the weights of the remaining source cells are renormalized for every target shape. The weighted sum of the
+    values and of the mask of the valid values are calculated together so there is no loop over time or cells
+
+    Arguments
+    ---------
+    values: the values of the source cell for every row of the intersection [time,n]
+    index_target: the index of the target shape for every row of the intersection [n,]
+    w: the weight for every row of the intersection [n,]
+    n_target: the number of target shapes [1,]
+    min_coverage: the minimum part of the weights of a target shape that should have valid values, otherwise the
+                  result is NaN, value between 0 and 1. Default = 0
+
+    Returns
+    -------
+    data: a numpy array with the weighted average for every target shape [k,time]
+    """
+    valid = ~np.isnan(values)
+    data = weighted_sum(np.where(valid, values, 0), index_target, w, n_target)
+    w_valid = weighted_sum(valid.astype(float), index_target, w, n_target)
+    w_total = np.bincount(index_target, weights=w, minlength=n_target)[:, np.newaxis]
+
+    # renormalizing with the weights of the valid cells where the coverage is enough
+    enough = (w_valid > 0) & (w_valid >= min_coverage * w_total)
+    data = np.divide(data, w_valid, out=np.full(data.shape, np.nan), where=enough)
+    # keeping the sum of the weights of the target shape as in weighted_sum
+    return data * w_total
+
+
+def time_aggregate(data, label, time_aggregation):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function aggregates the consecutive time steps that have the same label, such as the same day or month
+
+    Arguments
+    ---------
+    data: the values [k,time]
+    label: the label of the aggregation window for every time step [time,]
+    time_aggregation: 'sum', 'mean', 'min' or 'max', string
+
+    Returns
+    -------
+    data: a numpy array with the aggregated values [k,windows]
+    """
+    if label.size == 0:
+        return data
+    # the first time step of every window
+    start = np.flatnonzero(np.r_[True, label[1:] != label[:-1]])
+    if time_aggregation == 'sum':
+        return np.add.reduceat(data, start, axis=1)
+    if time_aggregation == 'mean':
+        return np.add.reduceat(data, start, axis=1) / np.diff(np.r_[start, label.size])
+    if time_aggregation == 'min':
+        return np.minimum.reduceat(data, start, axis=1)
+    if time_aggregation == 'max':
+        return np.maximum.reduceat(data, start, axis=1)
+    raise ValueError('time_aggregation should be sum, mean, min or max')
+
+
+def area_ave_multi(case, shp_int_list,
+                   name_of_nc, name_of_variable,
+                   name_of_time_dim,
+                   name_of_lat_var, name_of_lon_var,
+                   nc_file_names=None, variable_unit='', variable_long_name='',
+                   starting_date_string=None, skipna=False, min_coverage=0,
+                   time_aggregation=None, time_window=24, prefetch=1, name_of_ID='IDS1'):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function maps the values of the NetCDF file(s) to many target shapefiles at once. The source cells of all the
+    intersections are stacked so that every NetCDF file is read only once for all the target shapefiles, instead of
+    once per grid and per target shape as in area_ave
+
+    Arguments
+    ---------
+    case: value [1,]
+            1 is for 3-dimensional variable with 1-dimentional lat and lon
+            2 is for 3-dimensional varibale with 2-dimentional lat and lon
+            3 is for 2-dimensional variable with 1-dimentional lat and lon (time series)
+    shp_int_list: list of the results of intersection_shp, one for each target shapefile
+    name_of_nc: full or part of nc file(s) name including nc, string, example 'XXX/*01*.nc'
+    name_of_variable: name of the varibale, string
+    name_of_time_dim: name of time dimension, string
+    name_of_lat_var: name of lat variable, string
+    name_of_lon_var: name of lon variable, string
+    nc_file_names: list of the names of the nc files to be saved, one for each target shapefile. Default = None, no
+                   file is saved
+    variable_unit: the unit of the variable to be saved, string. Default = ''
+    variable_long_name: the long name of the variable to be saved, string. Default = ''
+    starting_date_string: the starting point of the NetCDF file(s) to be saved "hours since 2010-01-01 00:00:00".
+                          Default = None, the units of the time variable of the first source NetCDF file are used.
+                          The time of all the source files is converted to these units. Needed if the source NetCDF
+                          files have no time variable and nc_file_names is given
+    skipna: logical, if True the missing values of the source cells are skipped and the weights are renormalized for
+            every time step (see weighted_sum_masked). Default = False
+    min_coverage: the minimum part of the weights of a target shape that should have valid values if skipna is True,
+                  value between 0 and 1. Default = 0
+    time_aggregation: the aggregation of the remapped values over time while reading the files, 'sum', 'mean',
+                      'min' or 'max'. Default = None, no aggregation
+    time_window: the aggregation window, either the number of time steps [1,] such as 24 for daily values from hourly
+                 values, or a date format string such as '%Y-%m-%d' for daily or '%Y-%m' for monthly values from the
+                 time variable of the nc files. Default = 24
+    prefetch: the number of the next nc files that are read in the background while the current one is remapped [1,].
+              Default = 1, 0 for reading the files one after the other
+    name_of_ID: name of the field with the ID of the target shapes in the intersections, such as the parent ID from
+                weights_aggregate, string. Default = 'IDS1'
+
+    Returns
+    -------
+    data_all: list of numpy arrays with the area average of every target shape [k,time], one for each target shapefile
+    """
+    import xarray as xr
+    import netCDF4 as nc4
+
+    # getting the weights of every target shapefile
+    weights = [weights_intersection(shp_int, name_of_ID=name_of_ID) for shp_int in shp_int_list]
+
+    # stacking the source cells of all the target shapefiles and keeping the unique ones
+    lat_all = np.concatenate([weight[2] for weight in weights])
+    lon_all = np.concatenate([weight[3] for weight in weights])
+    cells, index_cell = np.unique(np.column_stack((lat_all, lon_all)), axis=0, return_inverse=True)
+    index_cell = index_cell.reshape(-1)
+    index_cell = np.split(index_cell, np.cumsum([weight[2].size for weight in weights])[:-1])
+
+    names_all = glob.glob(name_of_nc)
+    names_all.sort()
+    if not names_all:
+        raise ValueError('no nc file is found for ' + name_of_nc)
+    data_all = [[] for _ in weights]
+    variable_time = []
+    calendar = None # the calendar of the time variable of the source nc files
+    time_count = 0 # the number of the time steps read so far
+    carry = None # the time steps of the last aggregation window, that may continue in the next file
+
+    # the index of the source cells are found once from the first file
+    with xr.open_dataset(names_all[0], decode_times=False) as da:
+        if nc_file_names is not None and starting_date_string is None and name_of_time_dim not in da.variables:
+            raise ValueError('the nc files have no time variable, starting_date_string is needed to save the nc files')
+        index = nc_cell_index(case, da, cells[:, 0], cells[:, 1], name_of_lat_var, name_of_lon_var)
+
+    # reading every nc file once for all the target shapefiles, the next files are read in the background
+    files = prefetch_map(lambda names: nc_read_file(names, index, name_of_variable, name_of_time_dim),
+                         names_all, prefetch=prefetch)
+    for n, (values, time_file, time_units, time_calendar) in enumerate(files):
+
+        data_file = []
+        for k, weight in enumerate(weights):
+            if skipna:
+                data_temp = weighted_sum_masked(values[:, index_cell[k]], weight[1], weight[4], weight[0].size,
+                                                min_coverage=min_coverage)
+            else:
+                data_temp = weighted_sum(values[:, index_cell[k]], weight[1], weight[4], weight[0].size)
+            data_file.append(data_temp)
+
+        # if there is no time variable then the time steps are counted
+        if time_file is None:
+            time_file = np.arange(time_count, time_count + values.shape[0])
+        else:
+            if starting_date_string is None:
+                starting_date_string = time_units
+            if calendar is None:
+                calendar = time_calendar
+            # converting the time to the units of the first file, or the given starting_date_string
+            if time_units != starting_date_string:
+                dates = nc4.num2date(time_file, time_units, calendar=time_calendar)
+                time_file = np.array(nc4.date2num(dates, starting_date_string, calendar=time_calendar), dtype=float)
+                time_units = starting_date_string
+
+        if time_aggregation is not None:
+            # the label of the aggregation window for every time step
+            if isinstance(time_window, str):
+                if time_units is None:
+                    raise ValueError('time_window as a date format needs the time variable with units in the nc file')
+                dates = nc4.num2date(time_file, time_units, calendar=time_calendar)
+                label_file = np.array([date.strftime(time_window) for date in dates])
+            else:
+                label_file = (time_count + np.arange(values.shape[0])) // time_window
+
+            # adding the time steps of the last window of the previous file
+            if carry is not None:
+                data_file = [np.concatenate((data_carry, data), axis=1) for data_carry, data in zip(carry[0], data_file)]
+                time_file = np.concatenate((carry[1], time_file))
+                label_file = np.concatenate((carry[2], label_file))
+                carry = None
+
+            # keeping the last window for the next file
+            if n < len(names_all) - 1:
+                split = np.flatnonzero(label_file != label_file[-1])
+                split = split[-1] + 1 if split.size > 0 else 0
+                carry = ([data[:, split:] for data in data_file], time_file[split:], label_file[split:])
+                data_file = [data[:, :split] for data in data_file]
+                time_file = time_file[:split]
+                label_file = label_file[:split]
+
+            # aggregating the complete windows, the time of a window is its first time step
+            data_file = [time_aggregate(data, label_file, time_aggregation) for data in data_file]
+            time_file = time_file[np.flatnonzero(np.r_[True, label_file[1:] != label_file[:-1]])] \
+                if label_file.size > 0 else time_file
+
+        for k, data in enumerate(data_file):
+            data_all[k].append(data)
+        variable_time.append(time_file)
+        time_count += values.shape[0]
+
+    data_all = [np.concatenate(data, axis=1) for data in data_all]
+
+    # saving one nc file for every target shapefile
+    if nc_file_names is not None:
+        variable_time = np.concatenate(variable_time)
+        for k, weight in enumerate(weights):
+            ID_target, index_target, lat, lon, w = weight
+            # the lat and lon of the target shapes are the weighted center of their source cells
+            w_sum = np.bincount(index_target, weights=w, minlength=ID_target.size)
+            lat_target = np.bincount(index_target, weights=w * lat, minlength=ID_target.size) / w_sum
+            lon_target = np.bincount(index_target, weights=w * lon, minlength=ID_target.size) / w_sum
+            write_netcdf(nc_file_names[k], data_all[k], name_of_variable, variable_unit,
+                         variable_long_name, lon_target, lat_target, ID_target,
+                         variable_time, starting_date_string,
+                         variable_time.size, ID_target.size,
+                         calendar=calendar if calendar is not None else 'gregorian')
+
+    return data_all
+
+
+def write_netcdf(nc_file_name, variable_data, variable_name, varibale_unit,
+                 varibale_long_name, lon_data, lat_data, ID_data,
+                 variable_time, starting_date_string,
+                 time_dim_length, n_dim_length, calendar='gregorian'):
+    """
+    @ author:                  Shervan Gharari
+    @ Github:                  https://github.com/ShervanGharari/candex
+    @ author's email id:       sh.gharari@gmail.com
+    @license:                  Apache2
+
+    This function takes in a single array of data with an ID and it lat and lon value and save it as nc file
+    
+    Arguments
+    ---------
+    nc_file_name: the name of the file to be saved, string
+    variable_data: the values of the variable to be saved, np array [n,time]
+    variable_name: the name of the variable to be saved, string
+    varibale_unit: the name of the units to be saved, string
+    varibale_long_name: the long name of the varibale to be saved, string
+    lon_data: lon data [n,]
+    lat_data: lat data [n,]
+    ID_data: ID data [n,]
+    variable_time: the name of the varibale time, string
+    starting_date_string: the starting point of the NetCDF file "hours since 2010-01-01 00:00:00"
+    time_dim_length: the length of the time dimension [1,]
+    n_dim_length: the length of the n dimension [1,]
+    calendar: the calendar of the time variable, string. Default = 'gregorian'
+    """
+    import netCDF4 as nc4
+
+    with nc4.Dataset(nc_file_name, "w", format="NETCDF4") as ncid:
+        
+        dimid_N = ncid.createDimension('n', n_dim_length)  # only write one variable
+        # dimid_T = ncid.createDimension('time', time_dim_length)
+        dimid_T = ncid.createDimension('time', None)
+
+        # Variables
+        time_varid = ncid.createVariable('time', 'f8', ('time', ))
+        # Attributes
+        time_varid.long_name = 'time'
+        time_varid.units = starting_date_string  # e.g. 'days since 1900-01-01 00:00'
+        time_varid.calendar = calendar
+        time_varid.standard_name = 'time'
+        time_varid.axis = 'T'
+        # Write data
+        time_varid[:] = variable_time
+
+        # Variables
+        lat_varid = ncid.createVariable('lat', 'f8', ('n', ))
+        lon_varid = ncid.createVariable('lon', 'f8', ('n', ))
+        ID_varid = ncid.createVariable('ID', 'f8', ('n', ))
+        # Attributes
+        lat_varid.long_name = 'latitude'
+        lon_varid.long_name = 'longitude'
+        ID_varid.long_name = 'ID'
+        lat_varid.units = 'degrees_north'
+        lon_varid.units = 'degrees_east'
+        ID_varid.units = '1'
+        lat_varid.standard_name = 'latitude'
+        lon_varid.standard_name = 'longitude'
+        # Write data
+        lat_varid[:] = lat_data
+        lon_varid[:] = lon_data
+        ID_varid[:] = ID_data
+
+        # Variable
+        data_varid = ncid.createVariable(variable_name, 'f8', ('n','time', ))
+        # Attributes
+        data_varid.long_name = varibale_long_name
+        data_varid.units = varibale_unit
+        # Write data
+        data_varid[:] = variable_data
+
+        ##
+        ncid.Conventions = 'CF-1.6'
+        ncid.License = 'The data were written by Shervan Gharari. Under Apache2.'
+        ncid.history = 'Created ' + time.ctime(time.time())
+        ncid.source = 'Written by script from library of Shervan Gharari (https://github.com/ShervanGharari/candex).'
@@ -4,6 +4,11 @@
 @ author's email id:       sh.gharari@gmail.com
 @ license:                 Apache2
 """
+import geopandas as gpd
+import matplotlib.pyplot as plt
+import numpy as np
+from candex.functions import *
+
 
 # reading the nc name or names, this example gets all the yearly or monthly values in 1990's
 nc_name = 'local_dir/*199*.nc' # the local directory should be copied and pasted here.
@@ -4,6 +4,11 @@
 @ author's email id:       sh.gharari@gmail.com
 @ license:                 Apache2
 """
+import geopandas as gpd
+import matplotlib.pyplot as plt
+import numpy as np
+from candex.functions import *
+
 
 # reading the name of the NetCDF file
 nc_name = 'local_dir/TMP.nc' # the local directory should be copied and pasted here.
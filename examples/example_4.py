@@ -4,6 +4,11 @@
 @ author's email id:       sh.gharari@gmail.com
 @ license:                 Apache2
 """
+import geopandas as gpd
+import matplotlib.pyplot as plt
+import numpy as np
+from candex.functions import *
+
 
 # example for many shapefile 4
 # the name of the NetCDF file to be read, all the file for 2010
@@ -0,0 +1,20 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+shapely_geometry = pytest.importorskip('shapely.geometry')
+
+from candex.functions import footprint_mask
+
+
+def test_footprint_mask_global_grid_with_correct_360():
+    # a 1 degree global grid in 0 to 360 degree, with the lon above 180 converted to negative lon as correct_360 does
+    lat, lon = np.meshgrid(np.arange(-89.5, 90), np.arange(0.5, 360), indexing='ij')
+    lon[lon > 180] = lon[lon > 180] - 360
+    basin = shapely_geometry.box(-2, 10, 2, 12) # crossing the 0 degree line
+
+    mask = footprint_mask(lat, lon, basin)
+
+    assert mask.shape == lat.shape
+    assert 0 < mask.sum() < 100
+    assert mask[(lat == 10.5) & (lon == -0.5)].all()
+    assert mask[(lat == 10.5) & (lon == 0.5)].all()